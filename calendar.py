@@ -1,13 +1,27 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import plotly.graph_objects as go
 import io
-from openpyxl import Workbook
+import hashlib
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 import base64
 import plotly.io as pio
 
+try:
+    import xlsxwriter
+except ImportError:  # fall back to openpyxl for Excel export
+    xlsxwriter = None
+
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:  # read .xlsx with openpyxl in read-only mode (see read_schedule)
+    EXCEL_ENGINE = None
+
 # =============================
 # PATHS
 # =============================
@@ -86,6 +100,55 @@ GREEK_ARCHETYPES = {
     }
 }
 
+# Sidebar legend, rendered once as a single HTML block
+LEGEND_HTML = "".join(
+    f'<div style="background-color:{info["color"]}20; padding:8px; margin:5px 0; border-left:4px solid {info["color"]}">'
+    f'<strong>{info.get("symbol", "")} {archetype}</strong><br>'
+    f'<small>{info["description"]}</small>'
+    f'</div>'
+    for archetype, info in GREEK_ARCHETYPES.items()
+    if archetype != "(empty)"
+)
+
+# Archetype -> symbol, for the calendar cell text
+ARCH_SYMBOLS = {archetype: info.get("symbol", "") for archetype, info in GREEK_ARCHETYPES.items()}
+
+# Week position of day names (first word of the "day" column)
+DAY_ORDER = {
+    'monday': 1, 'mon': 1, 'lundi': 1, 'lun': 1,
+    'tuesday': 2, 'tue': 2, 'mardi': 2, 'mar': 2,
+    'wednesday': 3, 'wed': 3, 'mercredi': 3, 'mer': 3,
+    'thursday': 4, 'thu': 4, 'jeudi': 4, 'jeu': 4,
+    'friday': 5, 'fri': 5, 'vendredi': 5, 'ven': 5,
+    'saturday': 6, 'sat': 6, 'samedi': 6, 'sam': 6,
+    'sunday': 7, 'sun': 7, 'dimanche': 7, 'dim': 7
+}
+
+# Interactive chart options (hover kept, toolbar hidden)
+PLOTLY_CONFIG = {"displayModeBar": False, "responsive": True}
+
+# Tab heading icon per week
+WEEK_ICONS = {"busy": "🔥", "quiet": "🌿"}
+
+# Rendered PNGs kept in memory (each export is a 3200×2400 image)
+PNG_CACHE_ENTRIES = 8
+
+# "Static render" image size (matches the 800 px on-screen chart height)
+STATIC_WIDTH = 1400
+STATIC_HEIGHT = 800
+
+# Use the Numba slot-fill kernel from this many events on (plain Python fills ~1.7 µs/event,
+# importing Numba and compiling costs ~1 s once per process)
+NUMBA_MIN_EVENTS = 5000
+
+# Rows shown in the "View raw data" table
+RAW_PREVIEW_ROWS = 500
+
+# Excel export layout
+EXCEL_HEADERS = ["Day", "Time", "Activity", "Archetype", "Notes"]
+TITLE_FONT = Font(bold=True, size=16)
+HEADER_FONT = Font(bold=True)
+
 # =============================
 # STREAMLIT CONFIG
 # =============================
@@ -96,42 +159,25 @@ st.caption("Hover over time slots for details.")
 # =============================
 # FONCTIONS
 # =============================
-def sort_days(days_list):
-    """Sort days of the week in correct order"""
-    day_order = {
-        'monday': 1, 'mon': 1, 'lundi': 1, 'lun': 1,
-        'tuesday': 2, 'tue': 2, 'mardi': 2, 'mar': 2,
-        'wednesday': 3, 'wed': 3, 'mercredi': 3, 'mer': 3,
-        'thursday': 4, 'thu': 4, 'jeudi': 4, 'jeu': 4,
-        'friday': 5, 'fri': 5, 'vendredi': 5, 'ven': 5,
-        'saturday': 6, 'sat': 6, 'samedi': 6, 'sam': 6,
-        'sunday': 7, 'sun': 7, 'dimanche': 7, 'dim': 7
-    }
-    
+def df_digest(df):
+    """Order-sensitive content digest of a DataFrame (row order decides overlapping events)"""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.blake2b(row_hashes.tobytes()).hexdigest()
+
+# Hash DataFrame arguments by content so cached renders survive reruns
+DF_HASH_FUNCS = {pd.DataFrame: df_digest}
+
+def sort_days(df):
+    """Sort the distinct days of a normalized DataFrame in week order"""
     # Filtrer les valeurs vides
-    filtered_days = []
-    for d in days_list:
-        if pd.notna(d):
-            d_str = str(d).strip()
-            if d_str and d_str.lower() != "nan":
-                filtered_days.append(d)
-    
-    # Trier en fonction de l'ordre des jours
-    def get_day_order_key(day_str):
-        if pd.isna(day_str) or not str(day_str).strip():
-            return 99
-        day_str_clean = str(day_str).strip().lower()
-        parts = day_str_clean.split()
-        if not parts:
-            return 99
-        return day_order.get(parts[0], 99)
-    
-    sorted_days = sorted(filtered_days, key=get_day_order_key)
-    
-    return sorted_days
+    day = df["day"]
+    filled = df[(day != "") & (day.str.lower() != "nan")]
+    
+    # Trier en fonction de l'ordre des jours (tri stable, précalculé dans normalize_dataframe)
+    return filled.sort_values("_day_code", kind="stable")["day"].unique().tolist()
 
 def parse_time_minutes(time_str):
-    """Convert HH:MM to minutes"""
+    """Convert HH:MM to minutes (scalar version of the _start_min/_end_min columns)"""
     try:
         if pd.isna(time_str):
             return None
@@ -191,14 +237,111 @@ def normalize_dataframe(df, file_name):
     st.sidebar.info(f"📊 {file_name}")
     st.sidebar.write(f"Columns: {list(df.columns)}")
     
+    # Precompute week order of each day (99 = unknown)
+    first_word = df["day"].str.lower().str.split().str[0]
+    df["_day_code"] = first_word.map(DAY_ORDER).fillna(99).astype("int8")
+    
+    # Precompute start/end as minutes since midnight (HH:MM[:SS], <NA> if unparseable)
+    for col in ("start", "end"):
+        hm = df[col].str.extract(r"^(\d+):(\d+)").astype("float64")
+        df[f"_{col}_min"] = (hm[0] * 60 + hm[1]).astype("Int32")
+    
+    # Precompute calendar cell text: "<symbol> <title>", max 30 characters
+    symbol = df["archetype"].map(ARCH_SYMBOLS).fillna("")
+    df["_display_text"] = ((symbol + " ").where(symbol != "", "") + df["title"]).str.slice(0, 30)
+    
+    # Precompute the hover notes line (notes are already cleaned to "" when missing)
+    df["_notes_html"] = np.where(df["notes"].str.len() > 0, "📎 <i>Notes: " + df["notes"] + "</i><br>", "")
+    
     return df
 
-def create_calendar_heatmap(df, days, week_key, show_text=True):
-    """Create calendar heatmap"""
-    if df.empty:
-        st.warning("No data to display")
-        return None
-    
+def excel_header_names(header):
+    """Name header cells like pd.read_excel: blanks -> "Unnamed: i", repeats -> ".1", ".2" suffixes"""
+    names = [f"Unnamed: {i}" if h is None else h for i, h in enumerate(header)]
+    unnamed = [i for i, h in enumerate(header) if h is None]
+    original = set(names)
+    counts = {}
+    for i in [i for i in range(len(names)) if header[i] is not None] + unnamed:
+        base = name = names[i]
+        count = counts.get(base, 0)
+        while count > 0:
+            counts[base] = count + 1
+            name = f"{base}.{count}"
+            count = count + 1 if name in original else counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def fast_read_xlsx(source):
+    """Read the first sheet of an .xlsx file as plain values (header = first row)
+
+    Like pd.read_excel, the sheet's stored dimensions are ignored, blank rows inside the
+    sheet are kept, trailing blank rows are dropped and short rows are padded to the widest row.
+    """
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        ws.reset_dimensions()
+        data = []
+        last_row_with_data = -1
+        for i, row in enumerate(ws.iter_rows(values_only=True)):
+            cells = list(row)
+            while cells and cells[-1] is None:
+                cells.pop()
+            if cells:
+                last_row_with_data = i
+            data.append(cells)
+    finally:
+        wb.close()
+    
+    data = data[:last_row_with_data + 1]
+    if not data:
+        return pd.DataFrame()
+    
+    width = max(len(cells) for cells in data)
+    header, *rows = [cells + [None] * (width - len(cells)) for cells in data]
+    return pd.DataFrame(rows, columns=excel_header_names(header))
+
+def read_schedule(source, name):
+    """Read a schedule workbook with calamine, or openpyxl's streaming reader for .xlsx"""
+    if EXCEL_ENGINE is None and not str(name).lower().endswith(".xls"):
+        return fast_read_xlsx(source)
+    return pd.read_excel(source, engine=EXCEL_ENGINE)
+
+@st.cache_data(show_spinner=False)
+def load_and_normalize_path(path_str: str, mtime: float, name: str) -> pd.DataFrame:
+    """Read and normalize an Excel file from disk (cached until the file changes)"""
+    raw = read_schedule(path_str, name)
+    return normalize_dataframe(raw, name)
+
+@st.cache_data(show_spinner=False)
+def load_and_normalize_bytes(digest: str, name: str, _data: bytes) -> pd.DataFrame:
+    """Read and normalize an uploaded Excel file (cached on its content digest)"""
+    raw = read_schedule(io.BytesIO(_data), name)
+    return normalize_dataframe(raw, name)
+
+def fill_slots(owner, starts, ends, day_idx, slot0, slot_min):
+    """Mark each slot of owner with the index of the first event covering it"""
+    for i in range(starts.shape[0]):
+        s = max(0, (starts[i] - slot0 + slot_min - 1) // slot_min)
+        e = min(owner.shape[0], (ends[i] - slot0 + slot_min - 1) // slot_min)
+        d = day_idx[i]
+        for k in range(s, e):
+            if owner[k, d] < 0:
+                owner[k, d] = i
+
+@st.cache_resource(show_spinner=False)
+def slot_fill_kernel():
+    """Return fill_slots compiled with Numba (compiled once per process), or as-is without Numba"""
+    try:
+        from numba import njit
+    except ImportError:
+        return fill_slots
+    return njit("void(int32[:, :], int32[:], int32[:], int32[:], int32, int32)")(fill_slots)
+
+@st.cache_data(show_spinner=False, hash_funcs=DF_HASH_FUNCS)
+def _build_fig_data(df, days, show_text=True):
+    """Compute heatmap grids (z, text, hover), colorscale, archetype count and slot labels (text is None when hidden)"""
     # Time slots from 6:00 to 23:00
     slot_minutes = 30
     start_hour = 6
@@ -210,78 +353,92 @@ def create_calendar_heatmap(df, days, week_key, show_text=True):
     # Get unique archetypes
     all_archetypes = sorted(set(df["archetype"].unique().tolist() + ["(empty)"]))
     arch_to_idx = {a: i for i, a in enumerate(all_archetypes)}
-    
-    # Prepare data for heatmap
-    z, text, hover = [], [], []
-    
-    for slot in slots:
-        row_z, row_t, row_h = [], [], []
-        
-        for day in days:
-            # Find events for this day and time slot
-            day_str = str(day).strip()
-            day_events = df[df["day"].str.strip().str.lower() == day_str.lower()]
-            matching_events = []
-            
-            for _, event in day_events.iterrows():
-                start_min = parse_time_minutes(event["start"])
-                end_min = parse_time_minutes(event["end"])
-                
-                if start_min and end_min and start_min <= slot < end_min:
-                    matching_events.append(event)
-            
-            if not matching_events:
-                # Empty slot
-                row_z.append(arch_to_idx["(empty)"])
-                row_t.append("")
-                row_h.append(f"<b>{day}</b><br>Free time<br><i>No scheduled activities</i>")
-            else:
-                # Use first matching event
-                event = matching_events[0]
-                archetype = event["archetype"]
-                row_z.append(arch_to_idx[archetype])
-                
-                # Display text
-                arch_info = GREEK_ARCHETYPES.get(archetype, {"symbol": ""})
-                symbol = arch_info.get("symbol", "")
-                display_text = f"{symbol} {event['title']}" if symbol else event['title']
-                row_t.append(display_text[:30])
-                
-                # Hover text
-                hover_text = f"""
-                <b>{day}</b><br>
-                <b>⏰ {event['start']} - {event['end']}</b><br>
-                📝 <b>{event['title']}</b><br>
-                🏛️ <i>{archetype}</i><br>
-                📋 {GREEK_ARCHETYPES.get(archetype, {}).get('description', '')}<br>
-                """
-                
-                if pd.notna(event.get('notes')) and str(event['notes']).strip():
-                    hover_text += f"📎 <i>Notes: {event['notes']}</i><br>"
-                
-                row_h.append(hover_text)
-        
-        z.append(row_z)
-        text.append(row_t)
-        hover.append(row_h)
-    
-    # Create colorscale
+    n_arch = len(all_archetypes)
+    n_slots, n_days = len(slots), len(days)
+    
+    # Map every event to its day column(s) once; labels differing only in case share events
+    day_cols = pd.DataFrame({"key": [str(d).strip().lower() for d in days], "col": range(n_days)})
+    event_keys = pd.DataFrame({"key": df["day"].str.strip().str.lower().to_numpy(), "pos": range(len(df))})
+    pairs = event_keys.merge(day_cols, on="key").sort_values(["pos", "col"], kind="stable")
+    events = df.iloc[pairs["pos"].to_numpy()].reset_index(drop=True)
+    day_idx = pairs["col"].to_numpy()
+    
+    start_min = events["_start_min"].to_numpy(dtype="float64", na_value=np.nan)
+    end_min = events["_end_min"].to_numpy(dtype="float64", na_value=np.nan)
+    valid = np.flatnonzero((start_min > 0) & (end_min > 0))
+    
+    # Find the first event covering each slot (-1 = free)
+    owner = np.full((n_slots, n_days), -1, dtype=np.int32)
+    fill = slot_fill_kernel() if len(valid) >= NUMBA_MIN_EVENTS else fill_slots
+    fill(
+        owner,
+        start_min[valid].astype(np.int32),
+        end_min[valid].astype(np.int32),
+        day_idx[valid].astype(np.int32),
+        np.int32(slots[0]),
+        np.int32(slot_minutes),
+    )
+    filled = owner >= 0
+    slot_events = valid[owner[filled]]
+    
+    # Prepare data for heatmap (empty slots by default)
+    # Smallest integer type that holds every archetype index (archetypes are free text)
+    z = np.full((n_slots, n_days), arch_to_idx["(empty)"], dtype=np.min_scalar_type(n_arch - 1))
+    hover = np.empty((n_slots, n_days), dtype=object)
+    for d, day in enumerate(days):
+        hover[:, d] = f"<b>{day}</b><br>Free time<br><i>No scheduled activities</i>"
+    
+    # Per-archetype lookups, indexed like z
+    arch_desc = [GREEK_ARCHETYPES.get(a, {}).get("description", "") for a in all_archetypes]
+    arch_idx = events["archetype"].map(arch_to_idx).to_numpy(dtype=np.intp)
+    
+    # Hover text, rendered once per event
+    nl = "\n                "
+    event_days = pd.Series(np.asarray(days, dtype=object)[day_idx], dtype=object)
+    hover_html = (
+        nl + "<b>" + event_days + "</b><br>"
+        + nl + "<b>⏰ " + events["start"] + " - " + events["end"] + "</b><br>"
+        + nl + "📝 <b>" + events["title"] + "</b><br>"
+        + nl + "🏛️ <i>" + events["archetype"] + "</i><br>"
+        + nl + "📋 " + pd.Series(arch_desc, dtype=object).iloc[arch_idx].to_numpy() + "<br>"
+        + nl + events["_notes_html"]
+    ).to_numpy()
+    
+    z[filled] = arch_idx[slot_events]
+    hover[filled] = hover_html[slot_events]
+    
+    # Display text (skipped entirely when hidden)
+    text = None
+    if show_text:
+        display_text = events["_display_text"].to_numpy(dtype=object)
+        text = np.full((n_slots, n_days), "", dtype=object)
+        text[filled] = display_text[slot_events]
+    
+    # Create colorscale: one flat band per archetype so colors are never interpolated
     colorscale = []
     for i, arch in enumerate(all_archetypes):
         color = GREEK_ARCHETYPES.get(arch, {"color": "#cccccc"})["color"]
-        colorscale.append([i/len(all_archetypes), color])
+        colorscale += [[i/n_arch, color], [(i+1)/n_arch, color]]
+    
+    return z, text, hover, colorscale, n_arch, y_labels
+
+def _assemble_fig(data, days, week_key, export=False):
+    """Build the Plotly figure from _build_fig_data output"""
+    z, text, hover, colorscale, n_arch, y_labels = data
     
     # Create figure
     fig = go.Figure(go.Heatmap(
         z=z,
         x=days,
         y=y_labels,
-        text=text if show_text else None,
+        text=text,
         hovertext=hover,
         hoverinfo="text",
         colorscale=colorscale,
+        zmin=-0.5,
+        zmax=n_arch - 0.5,
         showscale=False,
-        texttemplate="%{text}" if show_text else None,
+        texttemplate="%{text}" if text is not None else None,
         textfont=dict(size=10, color="black"),
         hovertemplate="%{hovertext}<extra></extra>"
     ))
@@ -300,69 +457,127 @@ def create_calendar_heatmap(df, days, week_key, show_text=True):
     
     fig.update_yaxes(autorange="reversed", showgrid=True)
     
+    if export:
+        # Adjust for export
+        fig.update_layout(
+            height=1200,
+            width=1600,
+            margin=dict(l=100, r=100, t=150, b=150),
+            title=dict(
+                text=f"📅 {week_key.capitalize()} Week Schedule - EXPORT",
+                font=dict(size=24)
+            )
+        )
+    
     return fig
 
-def export_calendar_as_png(df, days, week_key):
-    """Export as PNG"""
-    fig = create_calendar_heatmap(df, days, week_key, show_text=True)
+def create_calendar_heatmap(df, days, week_key, show_text=True):
+    """Create calendar heatmap"""
+    if df.empty:
+        st.warning("No data to display")
+        return None
     
-    if fig is None:
+    return _assemble_fig(_build_fig_data(df, days, show_text), days, week_key)
+
+@st.cache_data(show_spinner="Rendering PNG...", max_entries=PNG_CACHE_ENTRIES)
+def _png_bytes(df_hash, days, week_key, _df, show_text=True, export=True):
+    """Render the calendar to PNG bytes, export- or screen-sized (cached on the DataFrame hash)"""
+    if _df.empty:
         return None
     
-    # Adjust for export
-    fig.update_layout(
-        height=1200,
-        width=1600,
-        margin=dict(l=100, r=100, t=150, b=150),
-        title=dict(
-            text=f"📅 {week_key.capitalize()} Week Schedule - EXPORT",
-            font=dict(size=24)
-        )
-    )
+    # Reuses the grids already cached by the on-screen render
+    days = list(days)
+    fig = _assemble_fig(_build_fig_data(_df, days, show_text), days, week_key, export=export)
     
     # Convert to PNG
+    if export:
+        return pio.to_image(fig, format="png", width=1600, height=1200, scale=2)
+    return pio.to_image(fig, format="png", width=STATIC_WIDTH, height=STATIC_HEIGHT)
+
+def show_static_calendar(fig, df, days, week_key, show_text):
+    """Display the calendar as a PNG image instead of an interactive chart"""
+    try:
+        img_bytes = _png_bytes(df_digest(df), tuple(days), week_key, df, show_text=show_text, export=False)
+        st.image(img_bytes, width="stretch")
+    except Exception as e:
+        st.error(f"Error generating PNG: {e}")
+        st.plotly_chart(fig, width="stretch", config=PLOTLY_CONFIG)
+
+def export_calendar_as_png(df, days, week_key):
+    """Export as PNG"""
+    df_hash = df_digest(df)
     try:
-        img_bytes = pio.to_image(fig, format="png", width=1600, height=1200, scale=2, engine="kaleido")
-        return io.BytesIO(img_bytes)
+        img_bytes = _png_bytes(df_hash, tuple(days), week_key, df)
     except Exception as e:
         st.error(f"Error generating PNG: {e}")
         return None
+    
+    if img_bytes is None:
+        return None
+    return io.BytesIO(img_bytes)
+
+def excel_rows(df, days):
+    """Yield one export row per event (or a "Free time" row for empty days)"""
+    # Group events by day once instead of masking the DataFrame per day
+    groups = dict(tuple(df.groupby(df["day"].str.strip().str.lower(), sort=False)))
+    
+    for day in days:
+        day_str = str(day).strip()
+        day_events = groups.get(day_str.lower())
+        
+        if day_events is None:
+            yield [day, None, "Free time"]
+        else:
+            for _, event in day_events.iterrows():
+                yield [day, f"{event['start']}-{event['end']}", event['title'], event['archetype'], event['notes']]
 
 def create_excel_export(df, week_type, days):
-    """Create Excel export"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"{week_type} Schedule"
+    """Create Excel export (xlsxwriter in constant-memory mode, openpyxl fallback)"""
+    if xlsxwriter is None:
+        return create_excel_export_openpyxl(df, week_type, days)
+    
+    excel_buffer = io.BytesIO()
+    wb = xlsxwriter.Workbook(excel_buffer, {
+        "constant_memory": True,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+    })
+    ws = wb.add_worksheet(f"{week_type} Schedule")
     
     # Title
-    ws['A1'] = f"📋 {week_type.capitalize()} Week Schedule"
-    ws['A1'].font = Font(bold=True, size=16)
+    ws.write_string(0, 0, f"📋 {week_type.capitalize()} Week Schedule", wb.add_format({"bold": True, "font_size": 16}))
     
     # Headers
-    headers = ["Day", "Time", "Activity", "Archetype", "Notes"]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
-        cell.font = Font(bold=True)
+    ws.write_row(2, 0, EXCEL_HEADERS, wb.add_format({"bold": True}))
+    
+    # Data (constant-memory mode requires rows in order)
+    for row, values in enumerate(excel_rows(df, days), 3):
+        ws.write_row(row, 0, values)
+    
+    wb.close()
+    excel_buffer.seek(0)
+    return excel_buffer
+
+def create_excel_export_openpyxl(df, week_type, days):
+    """Create Excel export (write-only workbook, rows streamed with append)"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(f"{week_type} Schedule")
+    
+    # Title
+    title = WriteOnlyCell(ws, value=f"📋 {week_type.capitalize()} Week Schedule")
+    title.font = TITLE_FONT
+    ws.append([title])
+    ws.append([])
+    
+    # Headers (one shared Font instance)
+    header_cells = [WriteOnlyCell(ws, value=header) for header in EXCEL_HEADERS]
+    for cell in header_cells:
+        cell.font = HEADER_FONT
+    ws.append(header_cells)
     
     # Data
-    row = 4
-    for day in days:
-        day_str = str(day).strip()
-        day_events = df[df["day"].str.strip().str.lower() == day_str.lower()]
-        
-        if day_events.empty:
-            ws.cell(row=row, column=1, value=day)
-            ws.cell(row=row, column=3, value="Free time")
-            row += 1
-        else:
-            for _, event in day_events.iterrows():
-                ws.cell(row=row, column=1, value=day)
-                ws.cell(row=row, column=2, value=f"{event['start']}-{event['end']}")
-                ws.cell(row=row, column=3, value=event['title'])
-                ws.cell(row=row, column=4, value=event['archetype'])
-                if pd.notna(event.get('notes')):
-                    ws.cell(row=row, column=5, value=str(event['notes']))
-                row += 1
+    for values in excel_rows(df, days):
+        ws.append(values)
     
     # Save to bytes
     excel_buffer = io.BytesIO()
@@ -370,23 +585,82 @@ def create_excel_export(df, week_type, days):
     excel_buffer.seek(0)
     return excel_buffer
 
+def show_raw_data(df):
+    """Display the first RAW_PREVIEW_ROWS rows of the normalized columns"""
+    public_cols = [c for c in df.columns if not str(c).startswith("_")]
+    st.dataframe(df[public_cols].head(RAW_PREVIEW_ROWS), width="stretch", hide_index=True)
+    if len(df) > RAW_PREVIEW_ROWS:
+        st.caption(f"Showing the first {RAW_PREVIEW_ROWS} of {len(df)} rows")
+
+@st.fragment
+def _render_week(df, week_key, text_key):
+    """Render one week's tab; its widgets only rerun this fragment"""
+    icon = WEEK_ICONS[week_key]
+    
+    if df.empty:
+        st.info(f"No {week_key} week data available. Upload a file or place {week_key}_week.xlsx in the /data folder.")
+        return
+    
+    # Utiliser la fonction sort_days pour trier correctement
+    days = sort_days(df)
+    
+    if not days:
+        st.warning("No valid days found in the data. Please check your 'day' column.")
+        return
+    
+    st.subheader(f"{icon} {week_key.capitalize()} Week Schedule ({len(df)} events)")
+    st.write(f"**Days:** {', '.join(str(d) for d in days)}")
+    
+    # Show raw data for debugging (only serialized when ticked)
+    if st.checkbox("🔍 View raw data", value=False, key=f"show_{week_key}_raw"):
+        show_raw_data(df)
+    
+    show_text = st.checkbox("Show text in calendar", value=True, key=text_key)
+    static_render = st.checkbox("Static render", value=False, key=f"{week_key}_static")
+    
+    fig = create_calendar_heatmap(df, days, week_key, show_text)
+    if fig:
+        if static_render:
+            show_static_calendar(fig, df, days, week_key, show_text)
+        else:
+            st.plotly_chart(fig, width="stretch", config=PLOTLY_CONFIG)
+        
+        # Export buttons - CORRECTION ICI
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Bouton PNG avec download_button au lieu de markdown
+            if st.button("📥 Download PNG", key=f"png_{week_key}"):
+                png_buffer = export_calendar_as_png(df, days, week_key)
+                if png_buffer:
+                    st.download_button(
+                        label="📥 Click to download PNG",
+                        data=png_buffer,
+                        file_name=f"{week_key}_week_schedule.png",
+                        mime="image/png",
+                        key=f"download_png_{week_key}"
+                    )
+        
+        with col2:
+            # Bouton Excel
+            if st.button("📊 Download Excel", key=f"excel_{week_key}"):
+                excel_buffer = create_excel_export(df, week_key, days)
+                if excel_buffer:
+                    st.download_button(
+                        label="📥 Click to download Excel",
+                        data=excel_buffer,
+                        file_name=f"{week_key}_week_schedule.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key=f"download_excel_{week_key}"
+                    )
+
 # =============================
 # MAIN APP
 # =============================
 def main():
     # Display legend in sidebar
     st.sidebar.header("🏛️ Greek Time Archetypes")
-    for archetype, info in GREEK_ARCHETYPES.items():
-        if archetype != "(empty)":
-            color = info["color"]
-            symbol = info.get("symbol", "")
-            st.sidebar.markdown(
-                f'<div style="background-color:{color}20; padding:8px; margin:5px 0; border-left:4px solid {color}">'
-                f'<strong>{symbol} {archetype}</strong><br>'
-                f'<small>{info["description"]}</small>'
-                f'</div>',
-                unsafe_allow_html=True
-            )
+    st.sidebar.markdown(LEGEND_HTML, unsafe_allow_html=True)
     
     st.sidebar.markdown("---")
     st.sidebar.header("📂 Load Schedule Data")
@@ -400,16 +674,14 @@ def main():
     
     if busy_path.exists():
         try:
-            raw_busy = pd.read_excel(busy_path)
-            busy_df = normalize_dataframe(raw_busy, "busy_week.xlsx")
+            busy_df = load_and_normalize_path(str(busy_path), busy_path.stat().st_mtime, "busy_week.xlsx")
             st.sidebar.success(f"✅ Loaded busy week")
         except Exception as e:
             st.sidebar.error(f"❌ Error loading busy week: {e}")
     
     if quiet_path.exists():
         try:
-            raw_quiet = pd.read_excel(quiet_path)
-            quiet_df = normalize_dataframe(raw_quiet, "quiet_week.xlsx")
+            quiet_df = load_and_normalize_path(str(quiet_path), quiet_path.stat().st_mtime, "quiet_week.xlsx")
             st.sidebar.success(f"✅ Loaded quiet week: {len(quiet_df)} events")
         except Exception as e:
             st.sidebar.error(f"❌ Error loading quiet week: {e}")
@@ -424,8 +696,9 @@ def main():
     if uploaded_files:
         for uploaded_file in uploaded_files:
             try:
-                df = pd.read_excel(uploaded_file)
-                normalized_df = normalize_dataframe(df, uploaded_file.name)
+                data = uploaded_file.getvalue()
+                digest = hashlib.blake2b(data).hexdigest()
+                normalized_df = load_and_normalize_bytes(digest, uploaded_file.name, data)
                 
                 if "busy" in uploaded_file.name.lower():
                     busy_df = normalized_df
@@ -445,108 +718,10 @@ def main():
         tab1, tab2 = st.tabs(["🔥 Busy Week", "🌿 Quiet Week"])
         
         with tab1:
-            if not busy_df.empty:
-                # Utiliser la fonction sort_days pour trier correctement
-                days = sort_days(busy_df["day"].unique())
-                
-                if days:
-                    st.subheader(f"🔥 Busy Week Schedule ({len(busy_df)} events)")
-                    st.write(f"**Days:** {', '.join(str(d) for d in days)}")
-                    
-                    # Show raw data for debugging
-                    with st.expander("🔍 View raw data"):
-                        st.dataframe(busy_df)
-                    
-                    show_text = st.checkbox("Show text in calendar", value=True, key="busy_text")
-                    
-                    fig = create_calendar_heatmap(busy_df, days, "busy", show_text)
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        # Export buttons - CORRECTION ICI
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            # Bouton PNG avec download_button au lieu de markdown
-                            if st.button("📥 Download PNG", key="png_busy"):
-                                png_buffer = export_calendar_as_png(busy_df, days, "busy")
-                                if png_buffer:
-                                    st.download_button(
-                                        label="📥 Click to download PNG",
-                                        data=png_buffer,
-                                        file_name="busy_week_schedule.png",
-                                        mime="image/png",
-                                        key="download_png_busy"
-                                    )
-                        
-                        with col2:
-                            # Bouton Excel
-                            if st.button("📊 Download Excel", key="excel_busy"):
-                                excel_buffer = create_excel_export(busy_df, "busy", days)
-                                if excel_buffer:
-                                    st.download_button(
-                                        label="📥 Click to download Excel",
-                                        data=excel_buffer,
-                                        file_name="busy_week_schedule.xlsx",
-                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                        key="download_excel_busy"
-                                    )
-                else:
-                    st.warning("No valid days found in the data. Please check your 'day' column.")
-            else:
-                st.info("No busy week data available. Upload a file or place busy_week.xlsx in the /data folder.")
+            _render_week(busy_df, "busy", "busy_text")
         
         with tab2:
-            if not quiet_df.empty:
-                # Utiliser la fonction sort_days pour trier correctement
-                days = sort_days(quiet_df["day"].unique())
-                
-                if days:
-                    st.subheader(f"🌿 Quiet Week Schedule ({len(quiet_df)} events)")
-                    st.write(f"**Days:** {', '.join(str(d) for d in days)}")
-                    
-                    # Show raw data for debugging
-                    with st.expander("🔍 View raw data"):
-                        st.dataframe(quiet_df)
-                    
-                    show_text = st.checkbox("Show text in calendar", value=True, key="quiet_text")
-                    
-                    fig = create_calendar_heatmap(quiet_df, days, "quiet", show_text)
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        # Export buttons - CORRECTION ICI
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            # Bouton PNG avec download_button au lieu de markdown
-                            if st.button("📥 Download PNG", key="png_quiet"):
-                                png_buffer = export_calendar_as_png(quiet_df, days, "quiet")
-                                if png_buffer:
-                                    st.download_button(
-                                        label="📥 Click to download PNG",
-                                        data=png_buffer,
-                                        file_name="quiet_week_schedule.png",
-                                        mime="image/png",
-                                        key="download_png_quiet"
-                                    )
-                        
-                        with col2:
-                            # Bouton Excel
-                            if st.button("📊 Download Excel", key="excel_quiet"):
-                                excel_buffer = create_excel_export(quiet_df, "quiet", days)
-                                if excel_buffer:
-                                    st.download_button(
-                                        label="📥 Click to download Excel",
-                                        data=excel_buffer,
-                                        file_name="quiet_week_schedule.xlsx",
-                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                        key="download_excel_quiet"
-                                    )
-                else:
-                    st.warning("No valid days found in the data. Please check your 'day' column.")
-            else:
-                st.info("No quiet week data available. Upload a file or place quiet_week.xlsx in the /data folder.")
+            _render_week(quiet_df, "quiet", "quiet_text")
     
     else:
         st.error("""